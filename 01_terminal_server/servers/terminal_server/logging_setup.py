@@ -0,0 +1,297 @@
+"""
+This module implements a low-overhead, non-blocking logging pipeline.
+
+The simple `logging.basicConfig(stream=sys.stderr)` setup formats and writes
+every record on the thread that logs it. For an MCP server that is a problem:
+stderr is usually a pipe read by the client, and if the client stops reading,
+the pipe fills up and the next log call blocks the whole server.
+
+This pipeline demonstrates:
+1.  **Queue-Based Handlers**: Log calls only put the record on an in-memory
+    queue. A background thread formats and writes it, so a slow or blocked
+    stderr pipe stays off the hot path. If the queue is full, the record is dropped (and counted) instead of blocking.
+2.  **Lazy Formatting**: Records are formatted on the background thread, so
+    `logger.info("Got %s", value)` costs almost nothing on the hot path.
+    (An f-string is always formatted, even if the record is later dropped.)
+3.  **Truncation**: Long messages and arguments (like a failed command's full
+    stderr) are cut to a maximum length.
+4.  **Sampling and Rate Limits**: Per-logger limits for chatty INFO/DEBUG logs.
+    Warnings and errors are never sampled or rate limited.
+5.  **Drop Counters**: Every dropped record is counted and a summary is
+    written when the pipeline stops.
+"""
+
+import atexit
+import logging
+import queue
+import random
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_MAX_CHARS = 2000
+# How long shutdown waits for the queue to drain before giving up on the rest.
+DEFAULT_STOP_TIMEOUT_SECONDS = 2.0
+
+class LogStats:
+    """Thread-safe counters for records the pipeline dropped or shortened."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {"queue_full": 0, "rate_limited": 0, "sampled": 0, "unflushed": 0, "truncated": 0}
+
+    def increment(self, key: str):
+        with self._lock:
+            self._counts[key] += 1
+
+    def as_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    @property
+    def dropped(self) -> int:
+        counts = self.as_dict()
+        return counts["queue_full"] + counts["rate_limited"] + counts["sampled"] + counts["unflushed"]
+
+def _lookup(table: Dict[str, float], name: str) -> Optional[str]:
+    """Finds the table entry for a logger, falling back to its parents and then 'root'."""
+    while name:
+        if name in table:
+            return name
+        name = name.rpartition(".")[0]
+    return "root" if "root" in table else None
+
+class SamplingRateLimitFilter(logging.Filter):
+    """
+    Drops INFO/DEBUG records by per-logger sampling rates and rate limits.
+
+    - `sample_rates`: logger name -> fraction of records to keep (0.0 to 1.0).
+    - `rate_limits`: logger name -> maximum records per second (token bucket).
+
+    A setting for a logger also applies to its children (e.g. 'mcp' covers
+    'mcp.server'), and 'root' applies to every logger. A rate limit is one
+    shared budget for everything it covers, so `{"root": 100}` caps the whole
+    process at 100 INFO/DEBUG records per second.
+    """
+    def __init__(self, stats: LogStats, rate_limits: Optional[Dict[str, float]] = None, sample_rates: Optional[Dict[str, float]] = None):
+        super().__init__()
+        self.stats = stats
+        self.rate_limits = dict(rate_limits or {})
+        self.sample_rates = dict(sample_rates or {})
+        self._lock = threading.Lock()
+        # rate limit entry -> (tokens, last refill time)
+        self._buckets: Dict[str, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        sample_key = _lookup(self.sample_rates, record.name)
+        if sample_key is not None and random.random() >= self.sample_rates[sample_key]:
+            self.stats.increment("sampled")
+            return False
+
+        # The bucket belongs to the matched entry, so children share their parent's budget.
+        limit_key = _lookup(self.rate_limits, record.name)
+        if limit_key is not None and not self._take_token(limit_key, self.rate_limits[limit_key]):
+            self.stats.increment("rate_limited")
+            return False
+        return True
+
+    def _take_token(self, name: str, limit: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.setdefault(name, [limit, now])
+            # Refill the bucket for the time that passed, up to one second's worth.
+            bucket[0] = min(limit, bucket[0] + (now - bucket[1]) * limit)
+            bucket[1] = now
+            if bucket[0] < 1:
+                return False
+            bucket[0] -= 1
+            return True
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    A QueueHandler that never blocks and never formats on the calling thread.
+
+    The standard QueueHandler formats the message before queueing it; we only
+    truncate oversized strings and leave formatting to the background thread.
+    """
+    def __init__(self, log_queue: queue.Queue, stats: LogStats, max_chars: int = DEFAULT_MAX_CHARS):
+        super().__init__(log_queue)
+        self.stats = stats
+        self.max_chars = max_chars
+
+    def _truncate(self, value):
+        """
+        Shortens a large payload (str, bytes or a container) to `max_chars`.
+
+        Other values (numbers, small objects) pass through untouched, so
+        placeholders like `%d` keep working.
+        """
+        if isinstance(value, (bytes, bytearray)):
+            if len(value) <= self.max_chars:
+                return value
+            self.stats.increment("truncated")
+            return f"{bytes(value[:self.max_chars])!r}... [truncated {len(value) - self.max_chars} bytes]"
+        if isinstance(value, (list, tuple, dict, set, frozenset)):
+            value = str(value)
+        if isinstance(value, str) and len(value) > self.max_chars:
+            self.stats.increment("truncated")
+            return f"{value[:self.max_chars]}... [truncated {len(value) - self.max_chars} chars]"
+        return value
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if not record.args:
+            # No arguments: the message is the final text, so it is safe to cut.
+            record.msg = self._truncate(record.msg)
+        elif isinstance(record.args, tuple):
+            # With arguments, the message is a format string. Cutting it could drop
+            # a placeholder or leave a dangling '%', so only the arguments are cut.
+            record.args = tuple(self._truncate(arg) for arg in record.args)
+        elif isinstance(record.args, dict):
+            record.args = {key: self._truncate(arg) for key, arg in record.args.items()}
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.stats.increment("queue_full")
+
+class BoundedQueueListener(QueueListener):
+    """
+    A QueueListener whose shutdown can never block forever.
+
+    The standard listener stops by putting a marker on the queue with
+    `put_nowait` (which fails when the queue is full) and then waits for its
+    thread without a timeout (which hangs when the output pipe is stalled).
+    """
+    def __init__(self, log_queue: queue.Queue, handler: logging.Handler, stats: LogStats, stop_timeout: float = DEFAULT_STOP_TIMEOUT_SECONDS):
+        super().__init__(log_queue, handler, respect_handler_level=True)
+        self.stats = stats
+        self.stop_timeout = stop_timeout
+
+    def enqueue_sentinel(self):
+        try:
+            self.queue.put(self._sentinel, timeout=self.stop_timeout)
+        except queue.Full:
+            # The writer cannot keep up; discard what is left so the marker fits.
+            # Loop in case other threads refill the queue while we drain it.
+            while True:
+                try:
+                    self.queue.get_nowait()
+                    self.queue.task_done()
+                    self.stats.increment("unflushed")
+                except queue.Empty:
+                    pass
+                try:
+                    self.queue.put_nowait(self._sentinel)
+                    return
+                except queue.Full:
+                    continue
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self.enqueue_sentinel()
+        self._thread.join(self.stop_timeout)
+        # If the thread is still stuck writing, leave it; it is a daemon thread.
+        self._thread = None
+
+class LogPipeline:
+    """Owns the background listener thread and the drop counters."""
+    def __init__(self, listener: QueueListener, handler: logging.Handler, stats: LogStats):
+        self.listener = listener
+        self.handler = handler
+        self.stats = stats
+        self._stopped = False
+
+    def stop(self):
+        """Flushes the queue, stops the background thread and reports any drops."""
+        if self._stopped:
+            return
+        self._stopped = True
+        try:
+            self.listener.stop()
+        finally:
+            if self.stats.dropped:
+                self._write_summary()
+
+    def _write_summary(self):
+        """Writes the drop counters straight to the output handler, without waiting on a stuck writer."""
+        record = logging.makeLogRecord({
+            "name": "logging",
+            "levelno": logging.WARNING,
+            "levelname": "WARNING",
+            "msg": "Log records dropped or shortened: %s",
+            "args": (self.stats.as_dict(),),
+        })
+        # If the listener thread is stuck inside the handler, it holds this lock.
+        if self.handler.lock is not None and not self.handler.lock.acquire(timeout=DEFAULT_STOP_TIMEOUT_SECONDS):
+            return
+        try:
+            self.handler.emit(record)
+        finally:
+            if self.handler.lock is not None:
+                self.handler.lock.release()
+
+def configure_logging(
+    handler: logging.Handler,
+    level: int = logging.INFO,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    max_chars: int = DEFAULT_MAX_CHARS,
+    rate_limits: Optional[Dict[str, float]] = None,
+    sample_rates: Optional[Dict[str, float]] = None,
+) -> LogPipeline:
+    """
+    Routes all logging through a bounded queue to `handler` on a background thread.
+
+    Students: `handler` is where logs finally go (here, a stderr StreamHandler).
+    It replaces any handlers configured before, much like
+    `logging.basicConfig(force=True)`.
+    """
+    stats = LogStats()
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+
+    queue_handler = NonBlockingQueueHandler(log_queue, stats, max_chars)
+    queue_handler.addFilter(SamplingRateLimitFilter(stats, rate_limits, sample_rates))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = BoundedQueueListener(log_queue, handler, stats)
+    listener.start()
+
+    pipeline = LogPipeline(listener, handler, stats)
+    # Make sure queued records are written when the process exits.
+    atexit.register(pipeline.stop)
+    return pipeline
+
+if __name__ == "__main__":
+    # A quick self-check of truncation: run `python -m servers.terminal_server.logging_setup`.
+    _stats = LogStats()
+    _handler = NonBlockingQueueHandler(queue.Queue(), _stats, max_chars=20)
+    _formatter = logging.Formatter("%(message)s")
+
+    def _check(msg, *args):
+        record = _handler.prepare(logging.LogRecord("check", logging.INFO, __file__, 0, msg, args, None))
+        # Formatting must not raise, and the payload must be shortened.
+        text = _formatter.format(record)
+        assert len(text) < 120, text
+        return text
+
+    # Long format strings with arguments keep their placeholders intact.
+    assert _check("a" * 30 + " %s", "arg").endswith(" arg")
+    assert _check("b" * 19 + "%d", 5).endswith("5")
+    # Long arguments are truncated individually: str, bytes and containers.
+    assert "truncated" in _check("payload: %s", "x" * 100)
+    assert "truncated" in _check("payload: %s", b"y" * 100)
+    assert "truncated" in _check("payload: %s", list(range(100)))
+    # A message without arguments is final text, so it is cut directly.
+    assert "truncated" in _check("z" * 100)
+    print("logging_setup self-check passed:", _stats.as_dict())
@@ -3,15 +3,21 @@ import sys
 import logging
 from dotenv import load_dotenv
 # Import the MCPServer class from the MCP SDK.
-from mcp.server.mcpserver import MCPServer
+from mcp.server.mcpserver import Context, MCPServer
+
+try:
+    from .logging_setup import configure_logging
+except ImportError:
+    # This fallback allows the script to be run directly: python main.py
+    from logging_setup import configure_logging
 
 # Configure logging to output to stderr. 
 # This is crucial for MCP servers as stdout is used for JSON-RPC communication.
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    stream=sys.stderr
-)
+# A full stderr pipe must never stall the server, so records are queued and
+# written by a background thread (see logging_setup.py).
+_log_handler = logging.StreamHandler(sys.stderr)
+_log_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+configure_logging(_log_handler, level=logging.INFO, rate_limits={"root": 100})
 logger = logging.getLogger("terminal_server")
 
 # Load environment variables from a .env file if it exists.
@@ -21,20 +27,36 @@ load_dotenv()
 # Import the tool logic we defined in the other file.
 try:
     from .tools import execute_command
+    from .tracing import init_tracing, profile_call, server_span
 except ImportError:
     # This fallback allows the script to be run directly: python main.py
     from tools import execute_command
+    from tracing import init_tracing, profile_call, server_span
+
+def traced_execute_command(command: str, ctx: Context) -> str:
+    """
+    Wraps execute_command with tracing and optional profiling.
+
+    'ctx' is filled in by the MCP server and hidden from the AI model. It gives
+    us the request's '_meta' field, where the client may send its trace context.
+    """
+    with server_span("server.tools/call", ctx.request_context.meta, tool="execute_command"), profile_call("execute_command"):
+        return execute_command(command)
 
 def main():
     """
     Main entry point for the Terminal MCP Server.
     """
     
+    # Tracing and profiling are off unless MCP_TRACE_FILE / MCP_PROFILE are set.
+    init_tracing("terminal_server")
+
     # 1. Initialize the MCP Server.
     server = MCPServer("TerminalServer")
 
     # 2. Register our tool.
-    server.add_tool(execute_command)
+    # We register the traced wrapper under the original name and description.
+    server.add_tool(traced_execute_command, name="execute_command", description=execute_command.__doc__)
 
     # 3. Start the server.
     # Stdio stands for "Standard Input/Output".
@@ -3,6 +3,12 @@ import os
 import logging
 import platform
 
+try:
+    from .tracing import span
+except ImportError:
+    # This fallback allows the server to be run directly: python main.py
+    from tracing import span
+
 # Set up logger for this module
 logger = logging.getLogger(__name__)
 
@@ -50,28 +56,34 @@ def execute_command(command: str) -> str:
         # - timeout=30: Prevent hanging.
         # - cwd=WORKSPACE: Run the command inside the defined workspace directory.
         
-        logger.info(f"Executing command: {command} (in {WORKSPACE})")
+        # Arguments are passed separately (not as an f-string) so formatting
+        # happens on the logging thread and long values can be truncated.
+        logger.info("Executing command: %s (in %s)", command, WORKSPACE)
         
-        result = subprocess.run(
-            command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=30,
-            cwd=WORKSPACE
-        )
+        # The 'subprocess' span shows how much of the call is spent in the shell itself.
+        with span("subprocess", cwd=WORKSPACE) as subprocess_span:
+            result = subprocess.run(
+                command,
+                shell=True,
+                capture_output=True,
+                text=True,
+                timeout=30,
+                cwd=WORKSPACE
+            )
+            if subprocess_span is not None:
+                subprocess_span.attributes["returncode"] = result.returncode
         
         # If the command was successful (return code 0)
         if result.returncode == 0:
             return result.stdout if result.stdout.strip() else "Command executed successfully with no output."
         else:
             # If the command failed, return the error message from stderr.
-            logger.error(f"Command failed with exit code {result.returncode}: {result.stderr}")
+            logger.error("Command failed with exit code %d: %s", result.returncode, result.stderr)
             return f"Error (Exit Code {result.returncode}):\n{result.stderr}"
             
     except subprocess.TimeoutExpired:
-        logger.error(f"Command timed out: {command}")
+        logger.error("Command timed out: %s", command)
         return f"Error: The command timed out after 30 seconds."
     except Exception as e:
-        logger.exception(f"An unexpected error occurred while executing command: {command}")
+        logger.exception("An unexpected error occurred while executing command: %s", command)
         return f"An unexpected error occurred: {str(e)}"
@@ -0,0 +1,203 @@
+"""
+This module implements lightweight request tracing and opt-in profiling for the Terminal Server.
+
+A single tool call crosses several boundaries: the client, the stdio pipe, the
+server's tool handler and finally the shell subprocess. To see where the time
+goes, the server records 'spans' (named, timed sections of work) that join the
+client's trace.
+
+This project is standalone (it has its own requirements and is often run as
+`python main.py`), so this is a server-only copy of the tracing helpers in
+`02_mcp_adk_client/observability/tracing.py`. Keep the two span formats in sync.
+
+This module demonstrates:
+1.  **Trace Context Propagation**: A client may put a W3C-style `traceparent`
+    (plus the time the request was sent) into the JSON-RPC `_meta` field.
+    The server reads it back, so its spans join the client's trace.
+2.  **Spans**: Nested timings recorded with `with span("name"):`. The current
+    span is kept in a ContextVar, so nesting works across `await`.
+3.  **Export**: Finished spans are appended as JSON lines to a local file that
+    both client and server processes can share.
+4.  **Profiling**: An optional cProfile capture per tool call, saved only for
+    calls slower than a threshold.
+
+Everything is off unless the environment asks for it:
+- `MCP_TRACE_FILE`: path of the JSONL file that spans are appended to.
+- `MCP_PROFILE`: set to `1` to capture a cProfile per tool call.
+- `MCP_PROFILE_DIR`: where `.prof` files are written (default: `profiles`).
+- `MCP_PROFILE_MIN_MS`: only keep profiles of calls slower than this (default: 0).
+"""
+
+import cProfile
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+TRACE_FILE_ENV = "MCP_TRACE_FILE"
+PROFILE_ENV = "MCP_PROFILE"
+PROFILE_DIR_ENV = "MCP_PROFILE_DIR"
+PROFILE_MIN_MS_ENV = "MCP_PROFILE_MIN_MS"
+
+@dataclass
+class Span:
+    """A named, timed section of work that belongs to a trace."""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start: float
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    _t0: float = field(default_factory=time.perf_counter, repr=False)
+
+class _SpanExporter:
+    """Appends finished spans to a JSON lines file. Safe to share between threads."""
+    def __init__(self, path: str, service: str):
+        self.path = path
+        self.service = service
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Line buffering plus O_APPEND keeps lines from different processes intact.
+        self._file = open(path, "a", buffering=1, encoding="utf-8")
+
+    def export(self, span: Span, duration_ms: float):
+        record = {
+            "service": self.service,
+            "name": span.name,
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "start": span.start,
+            "duration_ms": round(duration_ms, 3),
+            "attributes": span.attributes,
+        }
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+_exporter: Optional[_SpanExporter] = None
+_current_span: ContextVar[Optional[Span]] = ContextVar("mcp_current_span", default=None)
+_profile_dir: Optional[str] = None
+_profile_min_ms = 0.0
+
+def init_tracing(service: str):
+    """
+    Enables tracing and profiling for this process, based on the environment.
+
+    Call this once at startup with a name that identifies the process in the
+    trace file (e.g. 'terminal_server').
+    """
+    global _exporter, _profile_dir, _profile_min_ms
+    trace_file = os.environ.get(TRACE_FILE_ENV)
+    _exporter = _SpanExporter(trace_file, service) if trace_file else None
+    if os.environ.get(PROFILE_ENV, "").lower() in ("1", "true", "cprofile"):
+        _profile_dir = os.environ.get(PROFILE_DIR_ENV, "profiles")
+        _profile_min_ms = float(os.environ.get(PROFILE_MIN_MS_ENV, "0"))
+        os.makedirs(_profile_dir, exist_ok=True)
+    else:
+        _profile_dir = None
+
+def _parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str]]:
+    """Returns (trace_id, parent_span_id) from a `traceparent` value, if valid."""
+    if not value:
+        return None
+    parts = value.split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+@contextmanager
+def span(name: str, traceparent: Optional[str] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Records a span around the body of a `with` block.
+
+    The new span is a child of the current span, or of `traceparent` when one
+    is given (e.g. received from the client). When tracing is
+    disabled this yields None and records nothing.
+    """
+    if _exporter is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    remote = _parse_traceparent(traceparent)
+    if remote is not None:
+        trace_id, parent_id = remote
+    elif parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    else:
+        trace_id, parent_id = secrets.token_hex(16), None
+
+    current = Span(name, trace_id, secrets.token_hex(8), parent_id, time.time(), dict(attributes))
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attributes["error"] = repr(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        _exporter.export(current, (time.perf_counter() - current._t0) * 1000)
+
+def _meta_get(meta: Any, key: str) -> Any:
+    """Reads a key from a `_meta` value, which may be a dict or a pydantic model."""
+    if meta is None:
+        return None
+    if isinstance(meta, dict):
+        return meta.get(key)
+    return getattr(meta, key, None)
+
+@contextmanager
+def server_span(name: str, meta: Any, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Records a server-side handler span that joins the caller's trace.
+
+    If the caller sent `sentAt`, a 'queue' span is also recorded covering
+    everything between the client sending the request and the handler starting:
+    client serialization, the stdio pipe, and the server's parsing and dispatch.
+    """
+    if _exporter is None:
+        yield None
+        return
+
+    traceparent = _meta_get(meta, "traceparent")
+    sent_at = _meta_get(meta, "sentAt")
+    with span(name, traceparent=traceparent, **attributes) as current:
+        if isinstance(sent_at, (int, float)):
+            queued_ms = max(0.0, (current.start - sent_at) * 1000)
+            queue = Span(f"{name} queue", current.trace_id, secrets.token_hex(8), current.parent_id, sent_at)
+            _exporter.export(queue, queued_ms)
+            current.attributes["queued_ms"] = round(queued_ms, 3)
+        yield current
+
+@contextmanager
+def profile_call(name: str) -> Iterator[None]:
+    """
+    Captures a cProfile of the body of a `with` block when `MCP_PROFILE` is set.
+
+    Profiles of calls faster than `MCP_PROFILE_MIN_MS` are discarded. The file
+    name contains the trace and span ids so it can be matched to the trace.
+    Open a profile with `python -m pstats <file>` or a viewer like snakeviz.
+    """
+    if _profile_dir is None:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    t0 = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        if elapsed_ms >= _profile_min_ms:
+            current = _current_span.get()
+            suffix = f"{current.trace_id}-{current.span_id}" if current else secrets.token_hex(8)
+            profiler.dump_stats(os.path.join(_profile_dir, f"{name}-{suffix}.prof"))
@@ -12,6 +12,8 @@ Key ADK concepts for students:
 3.  **InMemoryRunner**: A high-level orchestrator that manages the conversation 
     loop, session history, and tool execution.
 4.  **SessionService**: Manages the persistent state of a conversation.
+5.  **Tool Callbacks**: Hooks that run before/after each tool call. We use them
+    to answer repeated calls to pure tools from a local result cache.
 """
 
 import asyncio
@@ -19,7 +21,8 @@ import json
 import logging
 import os
 import sys
-from typing import List
+import time
+from typing import Any, Dict, List, Optional
 
 from dotenv import load_dotenv
 from rich.console import Console
@@ -35,35 +38,88 @@ from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
 from mcp import StdioServerParameters
 from google.genai import types
 
+from mcp_client.cache import ToolResultCache
+from observability.logging_setup import configure_logging
+from observability.tracing import init_tracing, propagate_env, record_span, tracing_enabled
+
 # --- INITIALIZATION ---
 # Load environment variables (like GOOGLE_API_KEY) from .env file
 load_dotenv()
 
-# Setup logging to stderr using Rich for beautiful formatting
+# Setup logging to stderr using Rich, behind the non-blocking queue in observability/logging_setup.py
 def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(message)s",
-        datefmt="[%X]",
-        handlers=[RichHandler(rich_tracebacks=True, console=Console(stderr=True))]
-    )
+    handler = RichHandler(rich_tracebacks=True, console=Console(stderr=True))
+    handler.setFormatter(logging.Formatter("%(message)s", datefmt="[%X]"))
+    configure_logging(handler, level=logging.INFO)
 
 console = Console()
 
+def make_cache_callbacks(cache: ToolResultCache):
+    """
+    Builds ADK before/after tool callbacks that serve pure tools from the cache.
+
+    If the 'before' callback returns a value, ADK skips the tool call entirely
+    and uses that value as the tool's response.
+    """
+    def _is_cacheable(tool) -> bool:
+        # McpTool keeps the original MCP tool definition, including its annotations.
+        mcp_tool = getattr(tool, "_mcp_tool", None)
+        return cache.is_cacheable(tool.name, getattr(mcp_tool, "annotations", None))
+
+    def before_tool_callback(tool, args: Dict[str, Any], tool_context) -> Optional[Dict]:
+        if not _is_cacheable(tool):
+            return None
+        return cache.get(tool.name, args)
+
+    def after_tool_callback(tool, args: Dict[str, Any], tool_context, tool_response: Dict) -> Optional[Dict]:
+        # Errors are never cached, so the next call tries again.
+        if _is_cacheable(tool) and isinstance(tool_response, dict) and not tool_response.get("isError"):
+            cache.put(tool.name, args, tool_response)
+        return None
+
+    return before_tool_callback, after_tool_callback
+
+def make_tracing_callbacks():
+    """
+    Builds ADK before/after tool callbacks that record one span per tool call.
+
+    McpToolset owns its MCP sessions, so we cannot add trace context to its
+    requests. These spans therefore show the client-side time of each call
+    (including the round trip to the server) as separate traces.
+    """
+    started: Dict[str, tuple] = {}
+
+    def before_tool_callback(tool, args: Dict[str, Any], tool_context) -> Optional[Dict]:
+        started[tool_context.function_call_id] = (time.time(), time.perf_counter())
+        return None
+
+    def after_tool_callback(tool, args: Dict[str, Any], tool_context, tool_response: Dict) -> Optional[Dict]:
+        start = started.pop(tool_context.function_call_id, None)
+        if start is not None:
+            wall, t0 = start
+            record_span("adk.call_tool", wall, (time.perf_counter() - t0) * 1000, tool=tool.name)
+        return None
+
+    return before_tool_callback, after_tool_callback
+
 async def main():
     setup_logging()
+    init_tracing("mcp-adk-client")
     
     config_file = "config.json"
     if not os.path.exists(config_file):
         console.print(f"[red]Error: {config_file} not found.[/red]")
         return
 
+    cache: Optional[ToolResultCache] = None
     try:
         # 1. LOAD CONFIGURATION
         # We read the list of MCP servers we want to connect to.
         with open(config_file, 'r') as f:
             config = json.load(f)
             servers_config = config.get("mcpServers", {})
+            # Optional result cache for pure tools (see 'toolCache' in config.json).
+            cache = ToolResultCache.from_config(config.get("toolCache"))
 
         # 2. CONNECT TO MCP SERVERS
         # We create a list of 'McpToolset' objects. In ADK, a 'Toolset' is a 
@@ -78,7 +134,7 @@ async def main():
                         server_params=StdioServerParameters(
                             command=info["command"],
                             args=info.get("args", []),
-                            env=info.get("env")
+                            env=propagate_env(info.get("env"))
                         ),
                         timeout=15.0
                     )
@@ -119,11 +175,25 @@ async def main():
         # The LlmAgent is the 'brain'. We tell it who it is, what model to use,
         # and give it the toolsets we just created.
         console.print("[cyan]Initializing Google ADK Agent...[/cyan]")
+        # ADK runs a list of callbacks in order; a 'before' callback that returns
+        # a value (like a cache hit) stops the list and skips the tool call.
+        before_tool_callbacks, after_tool_callbacks = [], []
+        if tracing_enabled():
+            before_trace, after_trace = make_tracing_callbacks()
+            before_tool_callbacks.append(before_trace)
+            after_tool_callbacks.append(after_trace)
+        if cache is not None:
+            before_cache, after_cache = make_cache_callbacks(cache)
+            before_tool_callbacks.append(before_cache)
+            after_tool_callbacks.append(after_cache)
+            console.print("[cyan]Tool result cache enabled.[/cyan]")
         agent = LlmAgent(
             name="mcp_adk_agent",
             model="gemini-2.0-flash",
             instruction="You are a helpful assistant that uses the provided tools from MCP servers to answer user queries.",
-            tools=mcp_toolsets
+            tools=mcp_toolsets,
+            before_tool_callback=before_tool_callbacks or None,
+            after_tool_callback=after_tool_callbacks or None
         )
         
         # 4. INITIALIZE THE RUNNER
@@ -188,6 +258,8 @@ async def main():
     except Exception as e:
         console.print(f"[red]Initialization failed: {e}[/red]")
     finally:
+        if cache is not None:
+            console.print(f"[cyan]Tool cache stats: {cache.stats()}[/cyan]")
         console.print("[yellow]Shutting down...[/yellow]")
 
 if __name__ == "__main__":
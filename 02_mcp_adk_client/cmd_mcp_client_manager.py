@@ -21,22 +21,22 @@ from rich.logging import RichHandler
 
 # Import our custom manager
 from mcp_client.manager import MCPClientManager
+from observability.logging_setup import configure_logging
+from observability.tracing import init_tracing
 
 # --- INITIALIZATION ---
 
-# Setup logging to stderr using Rich
+# Setup logging to stderr using Rich, behind the non-blocking queue in observability/logging_setup.py
 def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(message)s",
-        datefmt="[%X]",
-        handlers=[RichHandler(rich_tracebacks=True, console=Console(stderr=True))]
-    )
+    handler = RichHandler(rich_tracebacks=True, console=Console(stderr=True))
+    handler.setFormatter(logging.Formatter("%(message)s", datefmt="[%X]"))
+    configure_logging(handler, level=logging.INFO)
 
 console = Console()
 
 async def main():
     setup_logging()
+    init_tracing("mcp-client-manager")
     
     # Header explaining the purpose of this script
     console.print(Panel.fit(
@@ -125,6 +125,8 @@ async def main():
         console.print(f"[bold red]An unexpected error occurred:[/bold red] {e}")
     finally:
         # 5. SHUTDOWN
+        if manager.cache is not None:
+            console.print(f"[cyan]Tool cache stats: {manager.cache.stats()}[/cyan]")
         console.print("[yellow]Shutting down connections...[/yellow]")
         await manager.shutdown()
         console.print("[bold cyan]Goodbye![/bold cyan]")
@@ -0,0 +1,84 @@
+"""
+MCP Gateway Entry Point (Aggregating Server).
+
+This script starts a gateway that is itself an MCP server. It connects once to
+every server in config.json using the MCPClientManager, and then lets many
+clients share those upstream sessions.
+
+Key concepts for students:
+1.  **Aggregation**: Clients see one server offering the tools and resources of all upstream servers.
+2.  **Sharing**: N clients x M servers becomes M server processes instead of N x M.
+3.  **Transports**: 'stdio' serves a single client; 'sse' and 'streamable-http' serve many over HTTP.
+"""
+
+import argparse
+import asyncio
+import logging
+from rich.console import Console
+from rich.logging import RichHandler
+
+from mcp_client.manager import MCPClientManager
+from mcp_client.gateway import MCPGateway
+from observability.logging_setup import configure_logging
+from observability.tracing import init_tracing
+
+# --- INITIALIZATION ---
+
+# Setup logging to stderr using Rich, behind the non-blocking queue in observability/logging_setup.py
+# The gateway serves many clients, so INFO/DEBUG records are capped per second.
+def setup_logging():
+    handler = RichHandler(rich_tracebacks=True, console=Console(stderr=True))
+    handler.setFormatter(logging.Formatter("%(message)s", datefmt="[%X]"))
+    configure_logging(handler, level=logging.INFO, rate_limits={"root": 200})
+
+# With the stdio transport, stdout carries JSON-RPC, so all output goes to stderr.
+console = Console(stderr=True)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Aggregating MCP gateway over the servers in config.json.")
+    parser.add_argument("--config", default="config.json", help="Path to the MCP server configuration file.")
+    parser.add_argument("--transport", default="streamable-http", choices=["stdio", "sse", "streamable-http"])
+    parser.add_argument("--host", default="127.0.0.1", help="Host to bind for HTTP transports.")
+    parser.add_argument("--port", type=int, default=8000, help="Port to bind for HTTP transports.")
+    return parser.parse_args()
+
+async def main():
+    setup_logging()
+    init_tracing("mcp-gateway")
+    args = parse_args()
+
+    manager = MCPClientManager(args.config)
+
+    try:
+        # 1. LOAD CONFIGURATION
+        console.print("[yellow]Loading configuration...[/yellow]")
+        manager.load_config()
+
+        # 2. CONNECT TO UPSTREAM SERVERS (once, shared by every downstream client)
+        console.print("[yellow]Connecting to upstream MCP servers...[/yellow]")
+        await manager.connect_to_all()
+
+        if not manager.sessions:
+            console.print("[bold red]Error: No MCP servers connected. Check your config.json and server paths.[/bold red]")
+            return
+
+        # 3. SERVE THE MERGED CATALOG
+        gateway = MCPGateway(manager, host=args.host, port=args.port)
+        await gateway.serve(args.transport)
+
+    except FileNotFoundError as e:
+        console.print(f"[bold red]Configuration error:[/bold red] {e}")
+    except Exception as e:
+        console.print(f"[bold red]An unexpected error occurred:[/bold red] {e}")
+    finally:
+        # 4. SHUTDOWN
+        if manager.cache is not None:
+            console.print(f"[cyan]Tool cache stats: {manager.cache.stats()}[/cyan]")
+        console.print("[yellow]Shutting down upstream connections...[/yellow]")
+        await manager.shutdown()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass # Handle Ctrl+C gracefully
@@ -0,0 +1,176 @@
+"""
+This module implements an optional, in-memory cache for MCP tool results.
+
+Every tool call normally travels over the stdio pipe to the server process and
+back. For 'pure' tools, such as `echo_tool`, the same arguments always give the
+same answer, so a repeated call can be answered locally instead.
+
+This cache demonstrates:
+1.  **Tool Annotations**: MCP servers can mark tools with `readOnlyHint`. Only
+    such tools (or tools listed in config.json) are cached. `idempotentHint`
+    alone is not enough: an idempotent tool may still write, and skipping a
+    repeated write (e.g. re-creating a file deleted in between) would be wrong.
+2.  **Canonical Keys**: The tool name and arguments are serialized with sorted
+    keys and hashed, so `{"a": 1, "b": 2}` and `{"b": 2, "a": 1}` share an entry.
+3.  **TTL + LRU**: Entries expire after a per-tool time-to-live, and the least
+    recently used entries are evicted once the memory budget is exceeded.
+4.  **Metrics**: Hits, misses, evictions and expirations are counted so you can
+    see how many round trips the cache saved.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import mcp.types as types
+
+logger = logging.getLogger("mcp-tool-cache")
+
+DEFAULT_TTL_SECONDS = 60.0
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+def make_cache_key(tool_name: str, arguments: Optional[dict]) -> str:
+    """Returns a canonical hash of a tool name plus its arguments."""
+    payload = json.dumps(
+        {"tool": tool_name, "arguments": arguments or {}},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _estimate_size(value: Any) -> int:
+    """Approximates the memory used by a cached value from its JSON size."""
+    if hasattr(value, "model_dump_json"):
+        return len(value.model_dump_json())
+    return len(json.dumps(value, default=str))
+
+class ToolResultCache:
+    """
+    A TTL + LRU cache for results of side-effect-free MCP tools.
+
+    Students: The cache never decides on its own that a tool is safe to cache.
+    It trusts the server's annotations, or an explicit list in config.json.
+    Errors are never cached, so a failing call is always retried.
+    """
+    def __init__(
+        self,
+        default_ttl: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        tool_ttls: Optional[Dict[str, float]] = None,
+    ):
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Tools listed in config.json are cached even without annotations.
+        self.tool_ttls: Dict[str, float] = dict(tool_ttls or {})
+        # key -> (expires_at, size, value). OrderedDict keeps LRU order: oldest first.
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> Optional["ToolResultCache"]:
+        """
+        Builds a cache from the 'toolCache' section of config.json.
+
+        Returns None when the section is missing or disabled, so caching is opt-in.
+        """
+        if not config or not config.get("enabled", False):
+            return None
+        default_ttl = float(config.get("defaultTtlSeconds", DEFAULT_TTL_SECONDS))
+        tool_ttls = {
+            name: float((info or {}).get("ttlSeconds", default_ttl))
+            for name, info in config.get("tools", {}).items()
+        }
+        return cls(
+            default_ttl=default_ttl,
+            max_entries=int(config.get("maxEntries", DEFAULT_MAX_ENTRIES)),
+            max_bytes=int(config.get("maxBytes", DEFAULT_MAX_BYTES)),
+            tool_ttls=tool_ttls,
+        )
+
+    def is_cacheable(self, tool_name: str, annotations: Optional[types.ToolAnnotations]) -> bool:
+        """A tool is cacheable if config.json lists it or its annotations mark it as read-only."""
+        if tool_name in self.tool_ttls:
+            return True
+        if annotations is None:
+            return False
+        return annotations.readOnlyHint is True
+
+    def ttl_for(self, tool_name: str) -> float:
+        return self.tool_ttls.get(tool_name, self.default_ttl)
+
+    def get(self, tool_name: str, arguments: Optional[dict]) -> Optional[Any]:
+        """Returns the cached result, or None on a miss or an expired entry."""
+        key = make_cache_key(tool_name, arguments)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, size, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        # Mark as most recently used.
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, tool_name: str, arguments: Optional[dict], value: Any):
+        """
+        Stores a result. An existing, unexpired entry is kept as-is so that
+        re-storing a value served from the cache does not extend its lifetime.
+        """
+        key = make_cache_key(tool_name, arguments)
+        existing = self._entries.get(key)
+        if existing is not None and existing[0] > time.monotonic():
+            return
+        if existing is not None:
+            self._remove(key)
+
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            logger.debug("Result of '%s' is too large to cache (%d bytes).", tool_name, size)
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl_for(tool_name), size, value)
+        self._bytes += size
+
+        # Evict the least recently used entries until we are back within budget.
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the cache metrics as a plain dictionary."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
@@ -0,0 +1,137 @@
+"""
+This module implements an aggregating MCP Gateway on top of MCPClientManager.
+
+Normally every client process spawns its own copy of every server in
+config.json. With N clients and M servers that is N x M server processes.
+The gateway flips this around: it is *itself* an MCP server that many clients
+connect to, while it keeps a single shared set of upstream sessions (M
+processes in total).
+
+This gateway demonstrates:
+1.  **Aggregation**: Exposing the merged tool, resource and resource template catalogs of all upstream servers.
+2.  **Multiplexing**: Many downstream requests share one ClientSession per upstream server.
+    JSON-RPC request ids let concurrent calls on the same session be told apart.
+3.  **Routing**: Each call is forwarded using the manager's precomputed routing index.
+"""
+
+import base64
+import logging
+from typing import Any, Dict, Iterable, List
+
+from mcp.server.fastmcp.server import FastMCP
+from mcp.server.fastmcp.exceptions import ResourceError, ToolError
+from mcp.server.lowlevel.helper_types import ReadResourceContents
+import mcp.types as types
+
+from observability.tracing import server_span
+from .manager import MCPClientManager
+
+logger = logging.getLogger("mcp-gateway")
+
+class MCPGateway(FastMCP):
+    """
+    An MCP server that proxies tools and resources from upstream MCP servers.
+
+    Students: FastMCP normally serves the functions you register with
+    `@mcp.tool()`. Here we override its catalog and dispatch methods so that
+    it serves whatever the upstream servers offer instead.
+    """
+    def __init__(self, manager: MCPClientManager, name: str = "mcp-gateway", **settings: Any):
+        super().__init__(name, **settings)
+        self.manager = manager
+
+    async def list_tools(self) -> List[types.Tool]:
+        """Returns the merged tool catalog of every upstream server."""
+        return list(self.manager.tools.values())
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
+        """
+        Forwards a tool call to the upstream server that owns the tool.
+
+        Upstream errors are re-raised as ToolError so the downstream client
+        receives an error result, exactly as if the tool were local.
+        """
+        # Join the downstream client's trace, so upstream spans become its children.
+        try:
+            meta = self.get_context().request_context.meta
+        except (LookupError, ValueError):
+            meta = None
+
+        with server_span("gateway.call_tool", meta, tool=name):
+            try:
+                result = await self.manager.call_tool(name, arguments)
+            except ValueError as e:
+                raise ToolError(str(e)) from e
+
+        if result.isError:
+            message = " ".join(block.text for block in result.content if isinstance(block, types.TextContent))
+            raise ToolError(message or f"Tool {name} failed on the upstream server.")
+
+        # Pass structured output through so tools with an outputSchema stay valid.
+        if result.structuredContent is not None:
+            return result.content, result.structuredContent
+        return result.content
+
+    async def list_resources(self) -> List[types.Resource]:
+        """Returns the merged resource catalog of every upstream server."""
+        return list(self.manager.resources.values())
+
+    async def list_resource_templates(self) -> List[types.ResourceTemplate]:
+        """Returns the merged resource template catalog of every upstream server."""
+        return list(self.manager.resource_templates.values())
+
+    async def read_resource(self, uri: Any) -> Iterable[ReadResourceContents]:
+        """Forwards a resource read to the upstream server that owns the URI."""
+        try:
+            result = await self.manager.read_resource(str(uri))
+        except ValueError as e:
+            raise ResourceError(str(e)) from e
+
+        contents: List[ReadResourceContents] = []
+        for item in result.contents:
+            if isinstance(item, types.TextResourceContents):
+                contents.append(ReadResourceContents(content=item.text, mime_type=item.mimeType))
+            else:
+                # Binary resources travel base64-encoded; the server layer re-encodes them.
+                contents.append(ReadResourceContents(content=base64.b64decode(item.blob), mime_type=item.mimeType))
+        return contents
+
+    async def serve(self, transport: str = "streamable-http"):
+        """
+        Runs the gateway on the current event loop.
+
+        The upstream sessions must live on the same event loop as the server,
+        so we use FastMCP's async runners instead of `run()`, which would start
+        a new loop. Use 'stdio' for a single client, or 'sse' /
+        'streamable-http' to share the gateway between many clients.
+        """
+        logger.info("Starting gateway with %d tools and %d resources using %s transport...", len(self.manager.tools), len(self.manager.resources), transport)
+        if transport == "stdio":
+            await self.run_stdio_async()
+        elif transport == "sse":
+            await self._serve_http(self.sse_app())
+        elif transport == "streamable-http":
+            await self._serve_http(self.streamable_http_app())
+        else:
+            raise ValueError(f"Unknown transport: {transport}")
+
+    async def _serve_http(self, app):
+        """
+        Serves an HTTP app with uvicorn, the same way FastMCP's async runners do.
+
+        FastMCP lets uvicorn install its default log config, which gives the
+        'uvicorn' loggers their own synchronous stream handlers (access lines
+        even go to stdout). Passing `log_config=None` keeps uvicorn's handlers
+        out, so its records propagate to the root logger and go through our
+        queue, rate limits and drop counters like everything else.
+        """
+        import uvicorn
+
+        config = uvicorn.Config(
+            app,
+            host=self.settings.host,
+            port=self.settings.port,
+            log_level=self.settings.log_level.lower(),
+            log_config=None,
+        )
+        await uvicorn.Server(config).serve()
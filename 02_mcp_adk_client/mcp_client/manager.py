@@ -10,6 +10,8 @@ This manager demonstrates:
 2.  **Lifecycle Management**: Using `AsyncExitStack` to ensure all connections are properly closed.
 3.  **Tool Discovery**: How a client 'asks' a server what capabilities it has.
 4.  **Multiplexing**: Connecting to and managing multiple servers simultaneously.
+5.  **Routing**: Precomputing which server owns each tool and resource, so a
+    call goes straight to the right session instead of asking every server.
 """
 
 import asyncio
@@ -17,15 +19,29 @@ import json
 import logging
 import sys
 import os
-from typing import Dict, List, Optional
+import re
+import time
+from typing import Dict, List, Optional, Tuple
 from contextlib import AsyncExitStack, asynccontextmanager
 
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 import mcp.types as types
+from pydantic import AnyUrl
+
+from observability.tracing import inject, propagate_env, span
+from .cache import ToolResultCache
 
 logger = logging.getLogger("mcp-client-manager")
 
+# Unknown tool names or URIs rebuild the routing index at most this often.
+INDEX_REBUILD_COOLDOWN_SECONDS = 5.0
+
+def _template_pattern(uri_template: str) -> "re.Pattern[str]":
+    """Turns a URI template like 'file://{path}' into a regex that matches concrete URIs."""
+    parts = re.split(r"\{[^}]+\}", uri_template)
+    return re.compile("[^/]+".join(re.escape(part) for part in parts) + "$")
+
 class MCPClientManager:
     """
     Manages connections to multiple MCP servers via STDIO.
@@ -40,6 +56,19 @@ class MCPClientManager:
         # It ensures that even if one connection fails, others are cleaned up correctly.
         self.exit_stack = AsyncExitStack()
         self._server_params: Dict[str, StdioServerParameters] = {}
+        # The merged catalogs of every connected server, keyed by tool name / resource URI.
+        self.tools: Dict[str, types.Tool] = {}
+        self.resources: Dict[str, types.Resource] = {}
+        self.resource_templates: Dict[str, types.ResourceTemplate] = {}
+        # The routing index: which server owns each tool name / resource URI / URI template.
+        self._tool_routes: Dict[str, str] = {}
+        self._resource_routes: Dict[str, str] = {}
+        self._template_routes: List[Tuple["re.Pattern[str]", str]] = []
+        # Misses may come from any downstream client, so rebuilds are serialized and rate limited.
+        self._index_lock = asyncio.Lock()
+        self._index_built_at = 0.0
+        # Optional result cache for pure tools, enabled by the 'toolCache' section of config.json.
+        self.cache: Optional[ToolResultCache] = None
 
     def load_config(self):
         """Loads the MCP server configurations from config.json."""
@@ -53,11 +82,13 @@ class MCPClientManager:
                 servers = config.get("mcpServers", {})
                 for name, info in servers.items():
                     # StdioServerParameters defines HOW to start the server process.
+                    # propagate_env forwards the tracing switches so servers record spans too.
                     self._server_params[name] = StdioServerParameters(
                         command=info["command"],
                         args=info.get("args", []),
-                        env=info.get("env")
+                        env=propagate_env(info.get("env"))
                     )
+                self.cache = ToolResultCache.from_config(config.get("toolCache"))
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse config JSON: {e}")
             raise
@@ -91,41 +122,161 @@ class MCPClientManager:
                 logger.warning(f"Ignoring server '{name}' because we were not able to connect to it: {e}")
                 logger.debug(f"Command attempted: {params.command} {' '.join(params.args)}")
 
+        # Once everyone is connected, precompute where each tool and resource lives.
+        await self.build_routing_index()
+
     async def list_all_tools(self) -> List[types.Tool]:
         """
         Aggregates tools from all connected servers.
         
         Students: This is how the agent 'sees' what it can do. 
-        Each server returns a list of its tools, and we combine them.
+        Each server returned a list of its tools when the routing index was
+        built, and we combined them into one catalog.
+        """
+        return list(self.tools.values())
+
+    async def build_routing_index(self):
+        """
+        Builds the merged tool/resource catalogs and the routing index.
+
+        Students: Asking every server for its tool list on every call is slow.
+        Instead we ask once, remember which server owns each tool and resource,
+        and route later calls with a single dictionary lookup. If two servers
+        expose the same name, the server listed first in config.json wins.
         """
-        all_tools = []
+        tools: Dict[str, types.Tool] = {}
+        resources: Dict[str, types.Resource] = {}
+        tool_routes: Dict[str, str] = {}
+        resource_routes: Dict[str, str] = {}
+        resource_templates: Dict[str, types.ResourceTemplate] = {}
+        template_routes: List[Tuple["re.Pattern[str]", str]] = []
+
         for name, session in self.sessions.items():
             try:
-                # Request the list of tools from the server via the session.
                 result = await session.list_tools()
                 for tool in result.tools:
-                    all_tools.append(tool)
+                    if tool.name in tool_routes:
+                        logger.warning("Tool '%s' on server '%s' is shadowed by server '%s'.", tool.name, name, tool_routes[tool.name])
+                        continue
+                    tools[tool.name] = tool
+                    tool_routes[tool.name] = name
+            except Exception as e:
+                logger.error("Failed to list tools for %s: %s", name, e)
+
+            try:
+                result = await session.list_resources()
+                for resource in result.resources:
+                    uri = str(resource.uri)
+                    if uri in resource_routes:
+                        logger.warning("Resource '%s' on server '%s' is shadowed by server '%s'.", uri, name, resource_routes[uri])
+                        continue
+                    resources[uri] = resource
+                    resource_routes[uri] = name
             except Exception as e:
-                logger.error(f"Failed to list tools for {name}: {e}")
-        return all_tools
+                # Not every server offers resources, so this is not an error.
+                logger.debug("No resources listed for %s: %s", name, e)
+
+            try:
+                result = await session.list_resource_templates()
+                for template in result.resourceTemplates:
+                    if template.uriTemplate in resource_templates:
+                        logger.warning("Resource template '%s' on server '%s' is shadowed.", template.uriTemplate, name)
+                        continue
+                    resource_templates[template.uriTemplate] = template
+                    template_routes.append((_template_pattern(template.uriTemplate), name))
+            except Exception as e:
+                logger.debug("No resource templates listed for %s: %s", name, e)
+
+        self.tools = tools
+        self.resources = resources
+        self.resource_templates = resource_templates
+        self._tool_routes = tool_routes
+        self._resource_routes = resource_routes
+        self._template_routes = template_routes
+        self._index_built_at = time.monotonic()
+        logger.info("Routing index built: %d tools, %d resources and %d resource templates across %d servers.", len(tools), len(resources), len(resource_templates), len(self.sessions))
+
+    async def _refresh_after_miss(self):
+        """
+        Rebuilds the routing index after an unknown name, at most once per cooldown.
+
+        A server may have added tools since we connected, so a miss is worth one
+        rebuild. But in the gateway any client can send unknown names, so we
+        never rebuild more often than INDEX_REBUILD_COOLDOWN_SECONDS, and the
+        lock makes concurrent misses wait for a single rebuild.
+        """
+        if time.monotonic() - self._index_built_at < INDEX_REBUILD_COOLDOWN_SECONDS:
+            return
+        async with self._index_lock:
+            # Another task may have rebuilt the index while we waited for the lock.
+            if time.monotonic() - self._index_built_at < INDEX_REBUILD_COOLDOWN_SECONDS:
+                return
+            await self.build_routing_index()
+
+    def _resource_owner(self, uri: str) -> Optional[str]:
+        """Finds the server for a URI: exact resources first, then URI templates."""
+        if uri in self._resource_routes:
+            return self._resource_routes[uri]
+        for pattern, server_name in self._template_routes:
+            if pattern.match(uri):
+                return server_name
+        return None
+
+    async def _session_for_tool(self, tool_name: str) -> Optional[ClientSession]:
+        """Looks up the session that owns a tool, refreshing the index on a miss."""
+        if tool_name not in self._tool_routes:
+            await self._refresh_after_miss()
+        return self.sessions.get(self._tool_routes.get(tool_name, ""))
+
+    async def _session_for_resource(self, uri: str) -> Optional[ClientSession]:
+        """Looks up the session that owns a resource, refreshing the index on a miss."""
+        server_name = self._resource_owner(uri)
+        if server_name is None:
+            await self._refresh_after_miss()
+            server_name = self._resource_owner(uri)
+        return self.sessions.get(server_name or "")
 
     async def call_tool(self, tool_name: str, arguments: dict) -> types.CallToolResult:
         """
         Calls a tool on the appropriate server.
         
-        It searches through active sessions to find which server owns the tool.
+        The routing index tells us which server owns the tool. If the result
+        cache is enabled and the tool is pure, repeated calls are answered
+        locally without a round trip to the server process.
         """
-        for server_name, session in self.sessions.items():
-            try:
-                tools_result = await session.list_tools()
-                if any(t.name == tool_name for t in tools_result.tools):
-                    # We found the server that has the tool. Execute it!
-                    return await session.call_tool(tool_name, arguments)
-            except Exception as e:
-                logger.warning(f"Error checking tools on server {server_name}: {e}")
-                continue
-        
-        raise ValueError(f"Tool {tool_name} not found on any active server session.")
+        with span("client.call_tool", tool=tool_name) as call_span:
+            with span("client.route"):
+                session = await self._session_for_tool(tool_name)
+            if session is None:
+                raise ValueError(f"Tool {tool_name} not found on any active server session.")
+
+            tool = self.tools.get(tool_name)
+            cacheable = self.cache is not None and self.cache.is_cacheable(tool_name, tool.annotations if tool else None)
+            if cacheable:
+                cached = self.cache.get(tool_name, arguments)
+                if call_span is not None:
+                    call_span.attributes["cache_hit"] = cached is not None
+                if cached is not None:
+                    return cached
+
+            # This span covers serialization, the stdio pipe and the server's handler.
+            # The trace context rides along in the request's '_meta' field, so the
+            # server can link its spans to ours (inject() is empty when tracing is off).
+            with span("client.rpc", server=self._tool_routes.get(tool_name)):
+                result = await session.call_tool(tool_name, arguments, meta=inject() or None)
+            # Errors are never cached, so the next call tries again.
+            if cacheable and not result.isError:
+                self.cache.put(tool_name, arguments, result)
+            return result
+
+    async def read_resource(self, uri: str) -> types.ReadResourceResult:
+        """
+        Reads a resource from the server that owns its URI.
+        """
+        session = await self._session_for_resource(uri)
+        if session is None:
+            raise ValueError(f"Resource {uri} not found on any active server session.")
+        return await session.read_resource(AnyUrl(uri))
 
     async def shutdown(self):
         """
@@ -0,0 +1 @@
+# Observability package (tracing and profiling shared by the client and servers)
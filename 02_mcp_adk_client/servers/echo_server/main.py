@@ -9,13 +9,17 @@ Key concepts demonstrated in this file:
 2.  **Tool Registration**: Exposing functions as tools that an AI agent (like a Gemini model) can call.
 3.  **Resource Registration**: Providing read-only data (like status information) via a standard URI format.
 4.  **Protocol-Safe Logging**: Using stderr for logging to avoid interfering with the JSON-RPC communication on stdout.
+5.  **Tracing**: Reading the caller's trace context from the request `_meta` so server timings join the client's trace.
 """
 
 import logging
 import sys
-from mcp.server.fastmcp.server import FastMCP
+from mcp.server.fastmcp.server import Context, FastMCP
+from mcp.types import ToolAnnotations
 from .tools import echo
 from .resources import connection_status
+from observability.logging_setup import configure_logging
+from observability.tracing import init_tracing, profile_call, server_span
 
 # --- PROTOCOL SAFETY: LOGGING TO STDERR ---
 # In the Model Context Protocol (MCP), the communication between the client (agent) and the server
@@ -23,13 +27,17 @@ from .resources import connection_status
 # If you use `print()` or write to stdout, it will corrupt the JSON-RPC stream.
 # Therefore, all logging MUST be directed to standard error (stderr).
 # Students: Always remember that stdout is for data (JSON-RPC), and stderr is for humans (logs).
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    stream=sys.stderr
-)
+# A full stderr pipe must never stall the server, so records are queued and
+# written by a background thread (see observability/logging_setup.py).
+_log_handler = logging.StreamHandler(sys.stderr)
+_log_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+configure_logging(_log_handler, level=logging.INFO, rate_limits={"echo-server": 100})
 logger = logging.getLogger("echo-server")
 
+# --- TRACING ---
+# Tracing and profiling are off unless MCP_TRACE_FILE / MCP_PROFILE are set.
+init_tracing("echo-server")
+
 # --- SERVER INITIALIZATION ---
 # We initialize the FastMCP with a descriptive name.
 # This name helps identify the server in logs and when multiple servers are connected to a client.
@@ -42,20 +50,27 @@ mcp = FastMCP("echo-server")
 # - What the tool does (the docstring)
 # - What parameters it needs (the arguments and their types)
 # Students: The LLM 'reads' your docstrings to decide if this tool is useful!
-@mcp.tool()
-def echo_tool(text: str) -> str:
+# The annotations tell clients that this tool has no side effects and always
+# returns the same output for the same input, so its results may be cached.
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True, idempotentHint=True))
+def echo_tool(text: str, ctx: Context) -> str:
     """
     Echoes the input text back to the caller.
     
     Args:
         text: The text to be echoed.
     """
-    # We log tool execution to stderr for visibility during development and debugging.
-    logger.info(f"Tool 'echo_tool' called with text: {text}")
-    
-    # We delegate the actual logic to a function in the 'tools.py' module.
-    # This keeps our entry point clean and separates protocol logic from business logic.
-    return echo(text)
+    # 'ctx' is filled in by FastMCP and hidden from the AI model. We use it to
+    # read the trace context that the client sent in the request's '_meta'.
+    with server_span("server.tools/call", ctx.request_context.meta, tool="echo_tool"), profile_call("echo_tool"):
+        # We log tool execution to stderr for visibility during development and debugging.
+        # Passing 'text' as an argument (instead of an f-string) defers formatting to
+        # the logging thread, and lets the pipeline truncate very long inputs.
+        logger.info("Tool 'echo_tool' called with text: %s", text)
+        
+        # We delegate the actual logic to a function in the 'tools.py' module.
+        # This keeps our entry point clean and separates protocol logic from business logic.
+        return echo(text)
 
 # --- RESOURCE REGISTRATION ---
 # A 'resource' is a piece of data that the AI agent can read, but not modify.